@@ -28,7 +28,6 @@ async def main():
         mq.Priority.IMMEDIATE,
     )
     queue.publish([message, another])
-    queue.statuses([message.id])
 
     messages = queue.consume(2)
 
@@ -42,9 +41,8 @@ async def main():
         print("started: ", message.id)
         jobs.append(queue.execute(message, handler))
 
-    print(queue.statuses([message.id for message in messages]))
     await asyncio.gather(*jobs)
-    print(queue.statuses([message.id for message in messages]))
+    print(await queue.wait_for([message.id for message in messages], timeout=60))
 
     queue.clean()
 
@@ -68,3 +68,11 @@ class DatabaseConnector(abc.ABC):
     @abc.abstractmethod
     def fail_message(self, id: uuid.UUID) -> None:
         pass
+
+    @abc.abstractmethod
+    def complete_messages(self, ids: list[uuid.UUID]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def fail_messages(self, ids: list[uuid.UUID]) -> None:
+        pass
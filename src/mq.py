@@ -3,7 +3,7 @@ import dataclasses
 import enum
 import json
 import uuid
-from typing import Any, Callable, Self
+from typing import Any, Awaitable, Callable, Mapping, Self
 
 
 class Priority(enum.Enum):
@@ -95,6 +95,19 @@ class MessageQueue(abc.ABC):
 
     @abc.abstractmethod
     def statuses(self, ids: list[uuid.UUID]) -> list[tuple[uuid.UUID, Status]]:
+        """
+        Current status of each id still in the queue.
+
+        Ids not in the queue are omitted. Unlike the other queue operations,
+        query errors are raised rather than logged and returned as an empty
+        list, so callers can tell a failed lookup from missing ids.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def wait_for(
+        self, ids: list[uuid.UUID], timeout: float | None = None
+    ) -> list[tuple[uuid.UUID, Status | None]]:
         pass
 
     @abc.abstractmethod
@@ -105,6 +118,22 @@ class MessageQueue(abc.ABC):
     async def execute(self, message: Message, handler: Callable) -> None:
         pass
 
+    @abc.abstractmethod
+    async def execute_batch(
+        self,
+        messages: list[Message],
+        handler: Callable[[list[Message]], Awaitable[Mapping[uuid.UUID, bool]]],
+    ) -> None:
+        pass
+
     @abc.abstractmethod
     def complete(self, id: uuid.UUID) -> None:
         pass
+
+    @abc.abstractmethod
+    def complete_many(self, ids: list[uuid.UUID]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def fail_many(self, ids: list[uuid.UUID]) -> None:
+        pass
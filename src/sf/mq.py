@@ -1,8 +1,9 @@
+import asyncio
 import json
 import logging
 import os
 import uuid
-from typing import Any, Callable, Optional
+from typing import Any, Awaitable, Callable, Mapping, Optional
 
 from snowflake import connector
 from snowflake.connector.result_set import ResultSet
@@ -11,6 +12,8 @@ from src.db import DatabaseConnector
 from src.mq import Message, MessageQueue, MessageType, Priority, Status
 
 PATH = os.path.dirname(__file__)
+# Snowflake caps an `in (...)` list at 16384 expressions.
+MAX_IDS_PER_QUERY = 10000
 
 logging.basicConfig(
     level=logging.WARNING,
@@ -20,6 +23,11 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def chunked(ids: list[uuid.UUID], size: int = MAX_IDS_PER_QUERY):
+    for i in range(0, len(ids), size):
+        yield ids[i : i + size]
+
+
 class Db(DatabaseConnector):
     def __init__(self, name: str, conn_params: dict[str, str], fresh: bool = False):
         self.name = name
@@ -302,22 +310,26 @@ class Db(DatabaseConnector):
         return retry_messages
 
     def message_statuses(self, ids: list[uuid.UUID]) -> list[tuple[uuid.UUID, Status]]:
-        """Message statuses from the Snowflake message queue."""
-        try:
+        """
+        Message statuses from the Snowflake message queue.
+
+        Query errors are raised rather than returned as an empty result, so
+        callers can tell a failed lookup from ids that are not in the queue.
+        """
+        statuses = []
+
+        for chunk in chunked(ids):
             rows = self._execute_query(
                 "message_statuses.sql",
-                params={"ids": [str(id) for id in ids]},
+                params={"ids": [str(id) for id in chunk]},
                 fetch=0,
             )
 
             if rows is None:
-                return []
-
-            statuses = rows
+                continue
 
-        except Exception as e:
-            logger.error(f"Error getting messages statuses: {e}", exc_info=True)
-            statuses = []
+            for row in rows:
+                statuses.append((uuid.UUID(row["ID"]), Status(row["STATUS"])))
 
         return statuses
 
@@ -391,6 +403,38 @@ class Db(DatabaseConnector):
         except Exception as e:
             logger.error(f"Error failing messages: {e}", exc_info=True)
 
+    def complete_messages(self, ids: list[uuid.UUID]) -> None:
+        """Mark a batch of messages as completed in the Snowflake message queue."""
+        for chunk in chunked(ids):
+            try:
+                self._execute_query(
+                    "complete_messages.sql",
+                    params={
+                        "ids": [str(id) for id in chunk],
+                        "completed": Status.COMPLETED.value,
+                    },
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error completing {len(chunk)} messages: {e}", exc_info=True
+                )
+
+    def fail_messages(self, ids: list[uuid.UUID]) -> None:
+        """Mark a batch of messages as failed in the Snowflake message queue."""
+        for chunk in chunked(ids):
+            try:
+                self._execute_query(
+                    "fail_messages.sql",
+                    params={
+                        "ids": [str(id) for id in chunk],
+                        "failed": Status.FAILED.value,
+                    },
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error failing {len(chunk)} messages: {e}", exc_info=True
+                )
+
 
 class Mq(MessageQueue):
     def __init__(self, db: Db):
@@ -423,6 +467,56 @@ class Mq(MessageQueue):
             return []
         return self.db.message_statuses(ids)
 
+    async def wait_for(
+        self,
+        ids: list[uuid.UUID],
+        timeout: Optional[float] = None,
+        min_interval: float = 1,
+        max_interval: float = 30,
+    ) -> list[tuple[uuid.UUID, Status | None]]:
+        """
+        Wait until every message is completed, failed or gone from the queue.
+
+        Polls statuses for the still pending ids only, backing off from
+        min_interval to max_interval while nothing changes and resetting
+        when progress is made. Returns one entry per id in the order given;
+        the status is None for ids no longer in the queue (moved to the dlq
+        or never published). Query errors propagate and TimeoutError is
+        raised after timeout seconds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        settled: dict[uuid.UUID, Status | None] = {}
+        pending = list(ids)
+        interval = min_interval
+
+        while True:
+            rows = dict(await asyncio.to_thread(self.statuses, pending))
+            still_pending = []
+            for id in pending:
+                status = rows.get(id)
+                if status in (Status.PROCESSING, Status.NEW):
+                    still_pending.append(id)
+                else:
+                    settled[id] = status
+
+            progressed = len(still_pending) < len(pending)
+            pending = still_pending
+            if len(pending) == 0:
+                break
+
+            interval = min_interval if progressed else min(interval * 2, max_interval)
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"{len(pending)} of {len(ids)} messages still pending"
+                    )
+                interval = min(interval, remaining)
+            await asyncio.sleep(interval)
+
+        return [(id, settled[id]) for id in ids]
+
     def dlq(self, n: int = 10) -> list[Message]:
         self.db.clean_mq()
         return self.db.fetch_dlq(n)
@@ -436,6 +530,16 @@ class Mq(MessageQueue):
     def fail(self, id: uuid.UUID) -> None:
         self.db.fail_message(id)
 
+    def complete_many(self, ids: list[uuid.UUID]) -> None:
+        if len(ids) == 0:
+            return
+        self.db.complete_messages(ids)
+
+    def fail_many(self, ids: list[uuid.UUID]) -> None:
+        if len(ids) == 0:
+            return
+        self.db.fail_messages(ids)
+
     async def execute(self, message: Message, handler: Callable):
         try:
             _ = await handler(message)
@@ -447,3 +551,46 @@ class Mq(MessageQueue):
             self.fail(message.id)
         else:
             self.complete(message.id)
+
+    async def execute_batch(
+        self,
+        messages: list[Message],
+        handler: Callable[[list[Message]], Awaitable[Mapping[uuid.UUID, bool]]],
+    ):
+        """
+        Call handler once per message type with all messages of that type.
+
+        The handler returns a mapping of message id to success. Only ids
+        mapped to True are completed; any other value or a missing id is
+        failed, as is the whole group if the handler raises or does not
+        return a mapping. Each group is acknowledged as soon as its handler
+        finishes.
+        """
+        batches: dict[MessageType, list[Message]] = {}
+        for message in messages:
+            batches.setdefault(message.message_type, []).append(message)
+
+        for message_type, batch in batches.items():
+            completed = []
+            failed = []
+            try:
+                results = await handler(batch)
+                if not isinstance(results, Mapping):
+                    raise TypeError(
+                        f"handler returned {type(results).__name__}, expected a mapping of id to success"
+                    )
+            except Exception as e:
+                logger.error(
+                    f"Error: failed to call handler function on {len(batch)} {message_type} messages with {e}",
+                    exc_info=True,
+                )
+                failed.extend(message.id for message in batch)
+            else:
+                for message in batch:
+                    if results.get(message.id) is True:
+                        completed.append(message.id)
+                    else:
+                        failed.append(message.id)
+
+            await asyncio.to_thread(self.complete_many, completed)
+            await asyncio.to_thread(self.fail_many, failed)
@@ -0,0 +1,5 @@
+update {name}
+set 
+    status = %(completed)s,
+    completed_at = current_timestamp
+where id in (%(ids)s);
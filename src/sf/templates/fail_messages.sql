@@ -0,0 +1,5 @@
+update {name}
+set 
+    status = %(failed)s,
+    failed_at = current_timestamp
+where id in (%(ids)s);
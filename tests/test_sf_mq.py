@@ -0,0 +1,224 @@
+import unittest
+import uuid
+
+from src.mq import Message, MessageType, Priority, Status
+from src.sf.mq import MAX_IDS_PER_QUERY, Db, Mq
+
+
+class FakeDb:
+    def __init__(self, polls=None):
+        self.completed: list[list[uuid.UUID]] = []
+        self.failed: list[list[uuid.UUID]] = []
+        self.polls = polls or []
+        self.polled: list[list[uuid.UUID]] = []
+
+    def message_statuses(self, ids: list[uuid.UUID]) -> list[tuple[uuid.UUID, Status]]:
+        self.polled.append(list(ids))
+        poll = self.polls[min(len(self.polled), len(self.polls)) - 1]
+        if isinstance(poll, Exception):
+            raise poll
+        return [(id, poll[id]) for id in ids if id in poll]
+
+    def complete_messages(self, ids: list[uuid.UUID]) -> None:
+        self.completed.append(list(ids))
+
+    def fail_messages(self, ids: list[uuid.UUID]) -> None:
+        self.failed.append(list(ids))
+
+
+def make_message(message_type: MessageType) -> Message:
+    return Message(uuid.uuid4(), message_type, {}, Priority.NORMAL)
+
+
+class ExecuteBatchTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.db = FakeDb()
+        self.queue = Mq(self.db)
+        self.ones = [make_message(MessageType.ModelOne) for _ in range(3)]
+        self.twos = [make_message(MessageType.ModelTwo) for _ in range(2)]
+        self.messages = [self.ones[0], self.twos[0], *self.ones[1:], self.twos[1]]
+
+    async def test_groups_by_message_type(self):
+        batches = []
+
+        async def handler(batch):
+            batches.append([message.message_type for message in batch])
+            return {message.id: True for message in batch}
+
+        await self.queue.execute_batch(self.messages, handler)
+
+        self.assertEqual(
+            batches,
+            [[MessageType.ModelOne] * 3, [MessageType.ModelTwo] * 2],
+        )
+        self.assertEqual(
+            self.db.completed,
+            [[m.id for m in self.ones], [m.id for m in self.twos]],
+        )
+        self.assertEqual(self.db.failed, [])
+
+    async def test_maps_results_per_message(self):
+        async def handler(batch):
+            return {batch[0].id: True, batch[1].id: False}
+
+        await self.queue.execute_batch(self.ones, handler)
+
+        self.assertEqual(self.db.completed, [[self.ones[0].id]])
+        self.assertEqual(self.db.failed, [[self.ones[1].id, self.ones[2].id]])
+
+    async def test_only_true_results_complete(self):
+        async def handler(batch):
+            return {batch[0].id: True, batch[1].id: "error", batch[2].id: 1}
+
+        await self.queue.execute_batch(self.ones, handler)
+
+        self.assertEqual(self.db.completed, [[self.ones[0].id]])
+        self.assertEqual(self.db.failed, [[self.ones[1].id, self.ones[2].id]])
+
+    async def test_handler_raising_fails_only_its_group(self):
+        async def handler(batch):
+            if batch[0].message_type == MessageType.ModelOne:
+                raise RuntimeError("boom")
+            return {message.id: True for message in batch}
+
+        await self.queue.execute_batch(self.messages, handler)
+
+        self.assertEqual(self.db.failed, [[m.id for m in self.ones]])
+        self.assertEqual(self.db.completed, [[m.id for m in self.twos]])
+
+    async def test_non_mapping_result_fails_group(self):
+        async def handler(batch):
+            return None
+
+        await self.queue.execute_batch(self.messages, handler)
+
+        self.assertEqual(
+            self.db.failed,
+            [[m.id for m in self.ones], [m.id for m in self.twos]],
+        )
+        self.assertEqual(self.db.completed, [])
+
+    async def test_acks_each_group_before_the_next_runs(self):
+        seen = []
+
+        async def handler(batch):
+            seen.append(list(self.db.completed))
+            return {message.id: True for message in batch}
+
+        await self.queue.execute_batch(self.messages, handler)
+
+        self.assertEqual(seen, [[], [[m.id for m in self.ones]]])
+
+
+def make_db(execute_query) -> Db:
+    db = Db.__new__(Db)
+    db._execute_query = execute_query
+    return db
+
+
+class DbAckTest(unittest.TestCase):
+    def test_failed_chunk_does_not_skip_later_chunks(self):
+        ids = [uuid.uuid4() for _ in range(MAX_IDS_PER_QUERY + 1)]
+        calls = []
+
+        def execute_query(template_name, params=None, **kwargs):
+            calls.append((template_name, params["ids"]))
+            if len(calls) == 1:
+                raise RuntimeError("connection lost")
+
+        for method, template_name in (
+            (Db.complete_messages, "complete_messages.sql"),
+            (Db.fail_messages, "fail_messages.sql"),
+        ):
+            with self.subTest(template_name=template_name):
+                calls.clear()
+                with self.assertLogs("src.sf.mq", level="ERROR"):
+                    method(make_db(execute_query), ids)
+
+                self.assertEqual(
+                    calls,
+                    [
+                        (template_name, [str(id) for id in ids[:-1]]),
+                        (template_name, [str(ids[-1])]),
+                    ],
+                )
+
+
+class DbStatusesTest(unittest.TestCase):
+    def test_chunks_ids_and_returns_typed_statuses(self):
+        ids = [uuid.uuid4() for _ in range(MAX_IDS_PER_QUERY + 1)]
+        calls = []
+
+        def execute_query(template_name, params=None, **kwargs):
+            calls.append((template_name, params["ids"]))
+            return [{"ID": id, "STATUS": Status.COMPLETED.value} for id in params["ids"]]
+
+        statuses = make_db(execute_query).message_statuses(ids)
+
+        self.assertEqual(
+            calls,
+            [
+                ("message_statuses.sql", [str(id) for id in ids[:-1]]),
+                ("message_statuses.sql", [str(ids[-1])]),
+            ],
+        )
+        self.assertEqual(statuses, [(id, Status.COMPLETED) for id in ids])
+        self.assertIsInstance(statuses[0][1], Status)
+
+
+class WaitForTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ids = [uuid.uuid4() for _ in range(3)]
+
+    def wait_for(self, polls, timeout=1):
+        self.db = FakeDb(polls)
+        queue = Mq(self.db)
+        return queue.wait_for(
+            self.ids, timeout=timeout, min_interval=0.001, max_interval=0.01
+        )
+
+    async def test_polls_only_pending_ids(self):
+        a, b, c = self.ids
+        polls = [
+            {a: Status.COMPLETED, b: Status.PROCESSING, c: Status.NEW},
+            {b: Status.FAILED, c: Status.PROCESSING},
+            {c: Status.COMPLETED},
+        ]
+
+        result = await self.wait_for(polls)
+
+        self.assertEqual(
+            result, [(a, Status.COMPLETED), (b, Status.FAILED), (c, Status.COMPLETED)]
+        )
+        self.assertEqual(self.db.polled, [[a, b, c], [b, c], [c]])
+
+    async def test_ids_missing_from_queue_are_marked_none(self):
+        a, b, c = self.ids
+        polls = [{a: Status.COMPLETED, c: Status.PROCESSING}, {c: Status.COMPLETED}]
+
+        result = await self.wait_for(polls)
+
+        self.assertEqual(
+            result, [(a, Status.COMPLETED), (b, None), (c, Status.COMPLETED)]
+        )
+
+    async def test_poll_error_propagates(self):
+        a, b, c = self.ids
+        polls = [
+            {a: Status.PROCESSING, b: Status.PROCESSING, c: Status.PROCESSING},
+            RuntimeError("connection lost"),
+        ]
+
+        with self.assertRaises(RuntimeError):
+            await self.wait_for(polls)
+
+    async def test_times_out_while_pending(self):
+        polls = [{id: Status.PROCESSING for id in self.ids}]
+
+        with self.assertRaises(TimeoutError):
+            await self.wait_for(polls, timeout=0.05)
+        self.assertGreater(len(self.db.polled), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()